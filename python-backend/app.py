@@ -1,41 +1,185 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from flask import Flask, Request, Response, request, jsonify
+from flask.json.provider import DefaultJSONProvider, JSONProvider
 from flasgger import Swagger
 
 import cv2
 import numpy as np
-from PIL import Image
 import base64
+import io
 import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Shape-detect wrapper (loads shape-detect.py via importlib)
 from shape_detect_api import run_shape_detect
 
 # Seven-segment OCR
-from seven_segment_ocr import SevenSegmentOCR, create_default_segment_boxes
+from seven_segment_ocr import (
+    SevenSegmentOCR,
+    create_default_segment_boxes,
+    segment_roi_stats,
+)
+
+# SIMD base64 codec (optional; falls back to the stdlib codec)
+try:
+    import pybase64
+    _b64decode = pybase64.b64decode
+    _b64encode_str = pybase64.b64encode_as_string
+except ImportError:
+    _b64decode = base64.b64decode
+
+    def _b64encode_str(data):
+        return base64.b64encode(data).decode("ascii")
+
+# orjson encoder (optional; falls back to the stdlib json provider)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Logging: request threads only enqueue records; a listener thread writes them
+log = logging.getLogger("timbermach")
+log.setLevel(logging.INFO)
+log.propagate = False
+_log_handler = QueueHandler(queue.SimpleQueue())
+log.addHandler(_log_handler)
+_log_listener = None
+
+
+def _start_log_listener():
+    """(Re)start the listener thread; also runs in forked workers"""
+    global _log_listener
+    _log_handler.queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    _log_listener = QueueListener(_log_handler.queue, stream_handler)
+    _log_listener.start()
+
+
+_start_log_listener()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_start_log_listener)
+
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes NumPy scalars/arrays during encoding"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, np.bool_):
+            return bool(o)
+        if isinstance(o, np.integer):
+            return int(o)
+        if isinstance(o, np.floating):
+            return float(o)
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        return DefaultJSONProvider.default(o)
+
+
+class ORJSONProvider(JSONProvider):
+    """JSON provider backed by orjson, which encodes NumPy types natively"""
+
+    OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    @staticmethod
+    def default(o):
+        # Non-contiguous arrays and NumPy scalars orjson does not take directly
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        if isinstance(o, np.generic):
+            return o.item()
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.OPTIONS).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.OPTIONS)
+        return self._app.response_class(body, mimetype="application/json")
+
+
+class InMemoryUploadRequest(Request):
+    """
+    Request that keeps multipart file parts in a BytesIO instead of spilling
+    them to a temp file, so uploads can be decoded from memory without a copy.
+    Bodies are capped by MAX_CONTENT_LENGTH.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
 
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app) if orjson else NumpyJSONProvider(app)
+app.request_class = InMemoryUploadRequest
+
+# Reject request bodies larger than this before they are parsed (HTTP 413)
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+
+# Configure CORS (static headers, built once)
+CORS_ORIGINS = frozenset([
+    "http://localhost:5173", "http://localhost:3000",
+    "http://127.0.0.1:5173", "http://127.0.0.1:3000",
+    "http://127.0.0.1:8000",
+])
+CORS_HEADERS = {
+    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type, Authorization",
+    "Access-Control-Expose-Headers": "Content-Type",
+    "Access-Control-Allow-Credentials": "true",
+}
+
+
+@app.after_request
+def _add_cors_headers(response):
+    """Echo allowed origins back with the precomputed CORS header set"""
+    origin = request.headers.get("Origin")
+    if origin in CORS_ORIGINS:
+        response.headers.update(CORS_HEADERS)
+        response.headers["Access-Control-Allow-Origin"] = origin
+        response.vary.add("Origin")
+    return response
 
-# Configure CORS
-CORS(app, resources={
-    r"/*": {
-        "origins": [
-            "http://localhost:5173", "http://localhost:3000",
-            "http://127.0.0.1:5173", "http://127.0.0.1:3000",
-            "http://127.0.0.1:8000"
-        ],
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
-        "expose_headers": ["Content-Type"],
-        "supports_credentials": True
-    }
-})
 
 # Laravel API URL
 LARAVEL_API_URL = "http://127.0.0.1:8000"
 
+# Shared keep-alive session for every Laravel call (pooled connections)
+# Retries: connect failures and 502/503/504 only; never re-send after a read timeout
+laravel_session = requests.Session()
+laravel_retry = Retry(
+    total=2, connect=2, read=0, status=2, backoff_factor=0.1,
+    status_forcelist=[502, 503, 504], allowed_methods=["GET", "POST"], raise_on_status=False,
+)
+laravel_session.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=50, max_retries=laravel_retry))
+
+# Circuit breaker: after LARAVEL_MAX_FAILURES straight failures, skip Laravel for LARAVEL_COOLDOWN seconds
+LARAVEL_MAX_FAILURES = 3
+LARAVEL_COOLDOWN = 15.0
+_laravel_fail_count = 0
+_laravel_open_until = 0.0
+_laravel_lock = threading.Lock()
+
+
+class LaravelUnavailable(requests.exceptions.ConnectionError):
+    """Raised without a network call while the Laravel circuit is open"""
+
 # Swagger
 swagger_config = {
     "headers": [],
@@ -64,59 +208,306 @@ swagger_template = {
     "schemes": ["http"],
 }
 
-swagger = Swagger(app, config=swagger_config, template=swagger_template)
+# Swagger UI is on by default for development; set ENABLE_SWAGGER=0 to skip it
+if os.environ.get("ENABLE_SWAGGER", "1") != "0":
+    swagger = Swagger(app, config=swagger_config, template=swagger_template)
+
+# JPEG quality for visualization overlays; /seven-segment/visualize is the
+# one users read boxes/labels from, so it keeps more detail
+VISUALIZATION_JPEG_QUALITY = 85
+VISUALIZE_JPEG_QUALITY = 95
+
+# Background threads for image encoding (OpenCV releases the GIL)
+image_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="image")
+
+# OpenCV's internal thread pool per call; cap it (e.g. 1) when several
+# server workers already keep every core busy
+if os.environ.get("OPENCV_THREADS"):
+    cv2.setNumThreads(int(os.environ["OPENCV_THREADS"]))
 
 # Seven-segment OCR instance
 seven_segment_ocr = SevenSegmentOCR()
 
+# Minimum seconds between calibration fetches from Laravel
+CALIBRATION_TTL = 30.0
+_calibration_fetched_at = 0.0
+_calibration_lock = threading.Lock()
+# Where the installed calibration came from: "laravel", "snapshot", "calibrate" or None
+_calibration_source = None
+# Backoff cap (seconds) while retrying Laravel behind a snapshot calibration
+CALIBRATION_RETRY_MAX = 30.0
+
+# Last calibration fetched from Laravel, reused on restart (skip the round trip).
+# Kept in the app's private instance folder, not a shared temp dir.
+CALIBRATION_SNAPSHOT = os.environ.get(
+    "CALIBRATION_SNAPSHOT", os.path.join(app.instance_path, "calibration_snapshot.json")
+)
+
+
+def _error_response(message, status=500):
+    """Standard JSON error body: {"error": message, "success": False}"""
+    return jsonify({"error": message, "success": False}), status
+
+
+@app.before_request
+def _reject_oversized_body():
+    """Refuse oversized uploads from the Content-Length header alone"""
+    if request.content_length is not None and request.content_length > MAX_UPLOAD_BYTES:
+        return _error_response("Request body too large", 413)
+    return None
+
 
-def load_calibration_from_laravel():
-    """Load active seven-segment calibration from Laravel database"""
+def laravel_request(method, path, **kwargs):
+    """Call the Laravel API through the shared session and circuit breaker"""
+    global _laravel_fail_count, _laravel_open_until
+
+    if time.monotonic() < _laravel_open_until:
+        raise LaravelUnavailable("Laravel API unavailable; circuit open")
+
+    kwargs.setdefault("timeout", 5)
+    response, error = None, None
     try:
-        print("📄 Loading calibration from Laravel...")
-        response = requests.get(f"{LARAVEL_API_URL}/api/calibration", timeout=5)
+        response = laravel_session.request(method, f"{LARAVEL_API_URL}{path}", **kwargs)
+        failed = response.status_code >= 500
+    except requests.exceptions.RequestException as e:
+        error, failed = e, True
 
-        if not response.ok:
-            print(f"❌ Failed to fetch from Laravel: {response.status_code}")
-            return False
+    with _laravel_lock:
+        if not failed:
+            _laravel_fail_count = 0
+        else:
+            _laravel_fail_count += 1
+            if _laravel_fail_count >= LARAVEL_MAX_FAILURES:
+                _laravel_open_until = time.monotonic() + LARAVEL_COOLDOWN
+                log.warning("⚠️ Laravel API failing; pausing calls for %.0fs", LARAVEL_COOLDOWN)
+
+    if error is not None:
+        raise error
+    return response
+
+
+def _laravel_json_body(response):
+    """
+    Raw body of a Laravel JSON response. Raises InvalidJSONError (a
+    RequestException) when the upstream Content-Type is not JSON, e.g. an
+    HTML error or login page, so callers fall back to _laravel_error().
+    """
+    content_type = response.headers.get("Content-Type", "")
+    if "json" not in content_type.lower():
+        raise requests.exceptions.InvalidJSONError(
+            f"Laravel returned non-JSON response ({content_type or 'no content type'})",
+            response=response,
+        )
+    return response.content
+
+
+def _laravel_passthrough(response):
+    """Forward a Laravel JSON body as-is (no parse/re-serialize round trip)"""
+    return Response(_laravel_json_body(response), mimetype="application/json")
+
+
+def _laravel_error(e):
+    """JSON error response for a failed Laravel proxy call"""
+    status = 503 if isinstance(e, LaravelUnavailable) else 500
+    log.warning("Laravel proxy call failed: %s", e)
+    return jsonify({"success": False, "error": "Failed to connect to Laravel API", "details": str(e)}), status
+
+
+def load_calibration_from_laravel(force=False):
+    """
+    Load active seven-segment calibration from Laravel database.
+    After a successful load, further fetches within CALIBRATION_TTL seconds
+    are skipped unless force=True. Fetches are serialized: concurrent
+    callers wait for the one in flight and then see its result.
+    """
+    global _calibration_fetched_at, _calibration_source
+
+    with _calibration_lock:
+        if (
+            not force
+            and _calibration_fetched_at
+            and time.monotonic() - _calibration_fetched_at < CALIBRATION_TTL
+        ):
+            return seven_segment_ocr.calibration is not None
 
-        calibrations = response.json()
-        active_calibration = None
+        try:
+            log.info("📄 Loading calibration from Laravel...")
+            response = laravel_request("GET", "/api/calibration")
+
+            if not response.ok:
+                log.warning("❌ Failed to fetch from Laravel: %s", response.status_code)
+                return False
+
+            active_calibration = next((cal for cal in response.json() if cal.get("is_active")), None)
 
-        for cal in calibrations:
-            if cal.get("is_active"):
-                active_calibration = cal
-                break
+            if not active_calibration:
+                # Laravel is authoritative: drop a deleted/deactivated calibration
+                log.warning("❌ No active calibration found")
+                _clear_calibration()
+                return False
 
-        if not active_calibration:
-            print("❌ No active calibration found")
+            _apply_calibration_record(active_calibration)
+            _calibration_source = "laravel"
+            _save_calibration_snapshot(active_calibration)
+            _calibration_fetched_at = time.monotonic()
+
+            log.info("✅ Loaded calibration (ID: %s)", active_calibration["id"])
+            return True
+
+        except Exception as e:
+            log.warning("❌ Error loading calibration: %s", e)
             return False
 
-        seven_segment_ocr.set_calibration(
-            display_box=active_calibration["display_box"],
-            segment_boxes=active_calibration["segment_boxes"],
-            has_decimal_point=active_calibration.get("has_decimal_point", False),
-            decimal_position=active_calibration.get("decimal_position", 1),
-        )
 
-        print(f"✅ Loaded calibration (ID: {active_calibration['id']})")
-        return True
+def _apply_calibration_record(record):
+    """Install a Laravel calibration record on the shared OCR instance"""
+    seven_segment_ocr.set_calibration(
+        display_box=record["display_box"],
+        segment_boxes=record["segment_boxes"],
+        has_decimal_point=record.get("has_decimal_point", False),
+        decimal_position=record.get("decimal_position", 1),
+    )
+
+    if record.get("calibration_image_size"):
+        seven_segment_ocr.calibration["calibration_image_size"] = record["calibration_image_size"]
+
 
+def _save_calibration_snapshot(record):
+    """Write the active calibration record to CALIBRATION_SNAPSHOT (atomic replace)"""
+    snapshot_dir = os.path.dirname(CALIBRATION_SNAPSHOT) or "."
+    tmp_path = None
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        # Unique, owner-only temp file in the same dir so os.replace stays atomic
+        fd, tmp_path = tempfile.mkstemp(dir=snapshot_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, CALIBRATION_SNAPSHOT)
+    except OSError as e:
+        log.warning("⚠️ Could not save calibration snapshot: %s", e)
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def _clear_calibration():
+    """Forget the active calibration in memory and on disk"""
+    global _calibration_source
+    seven_segment_ocr.calibration = None
+    _calibration_source = None
+    try:
+        os.remove(CALIBRATION_SNAPSHOT)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        log.warning("⚠️ Could not remove calibration snapshot: %s", e)
+
+
+def load_calibration_snapshot():
+    """
+    Load the active calibration saved by the last successful Laravel fetch.
+    Returns True if a snapshot was applied.
+    Only a fallback until preload_calibration() re-syncs with Laravel.
+    """
+    global _calibration_source
+    try:
+        with open(CALIBRATION_SNAPSHOT, encoding="utf-8") as f:
+            record = json.load(f)
+        _apply_calibration_record(record)
+        _calibration_source = "snapshot"
+    except FileNotFoundError:
+        return False
     except Exception as e:
-        print(f"❌ Error loading calibration: {e}")
+        log.warning("⚠️ Ignoring calibration snapshot: %s", e)
         return False
 
+    log.info("✅ Loaded calibration snapshot (ID: %s)", record.get("id"))
+    return True
+
 
-def _read_image_from_request():
+# Serve the saved snapshot until the startup Laravel refresh lands
+load_calibration_snapshot()
+
+
+def _sync_calibration_from_laravel():
+    """
+    Load the calibration from Laravel, retrying with exponential backoff
+    while only the (possibly stale) snapshot is installed. Stops once Laravel
+    answers, the calibration is cleared, or /seven-segment/calibrate replaces it.
+    """
+    delay = 1.0
+    while not load_calibration_from_laravel() and _calibration_source == "snapshot":
+        time.sleep(delay)
+        delay = min(delay * 2, CALIBRATION_RETRY_MAX)
+
+
+def preload_calibration():
+    """
+    Refresh the calibration from Laravel on a daemon thread, so a stale
+    snapshot is replaced and the first OCR request does not pay for the
+    round trip. Call after any fork (dev server start, gunicorn post_worker_init).
+    """
+    threading.Thread(target=_sync_calibration_from_laravel, name="calibration-preload", daemon=True).start()
+
+
+def _decode_image_bytes(image_bytes, reduced=False):
+    """
+    Decode encoded image bytes to a BGR array with cv2.imdecode (OpenCV's
+    bundled libjpeg-turbo; EXIF orientation is applied).
+    reduced=True decodes at half size (JPEG DCT scaling skips most IDCT work).
+    Returns None if the bytes cannot be decoded.
+    """
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_REDUCED_COLOR_2 if reduced else cv2.IMREAD_COLOR)
+
+
+def _decode_upload(file_storage, reduced=False):
+    """
+    Decode a multipart upload straight from its in-memory buffer
+    (see InMemoryUploadRequest) instead of copying it into bytes first.
+    """
+    stream = file_storage.stream
+    if hasattr(stream, "getbuffer"):
+        with stream.getbuffer() as view:
+            return _decode_image_bytes(view, reduced)
+    return _decode_image_bytes(stream.read(), reduced)
+
+
+def _fast_decode_requested():
+    """
+    True when the client sent fast=true and the calibration records the
+    image size it was drawn on, so boxes can be rescaled to a half-size frame.
+    """
+    calibration = seven_segment_ocr.calibration
+    if not calibration or not calibration.get("calibration_image_size"):
+        return False
+    return _request_flag("fast")
+
+
+def _request_option(name, default=None):
+    """Option from the JSON body, or from form/query"""
+    if request.is_json:
+        return (request.get_json(silent=True) or {}).get(name, default)
+    return request.values.get(name, default)
+
+
+def _request_flag(name):
+    """Boolean option from the JSON body, or from form/query as 'true'"""
+    if request.is_json:
+        return bool((request.get_json(silent=True) or {}).get(name, False))
+    return request.values.get(name, "false").lower() == "true"
+
+
+def _read_image_from_request(reduced=False):
     """
     Reads image either from multipart 'image' file
     or JSON { image: 'data:image/...base64' }.
     Returns: (img_bgr, err_string_or_None)
     """
     if "image" in request.files:
-        image_bytes = request.files["image"].read()
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        img = _decode_upload(request.files["image"], reduced)
         if img is None:
             return None, "Failed to decode image"
         return img, None
@@ -126,17 +517,25 @@ def _read_image_from_request():
         if "image" not in data:
             return None, "No image data"
 
-        image_data = data["image"]
-        if "," in image_data:
-            image_data = image_data.split(",")[1]
+        # Take the string out of the parsed JSON dict so that copy can be
+        # freed once decoded (the raw request body stays cached by Flask
+        # until the request ends)
+        image_data = data.pop("image")
+
+        # Strip a "data:image/...;base64," prefix. partition stops at the
+        # first comma; split(",") would scan the whole multi-MB payload.
+        prefix, comma, payload = image_data.partition(",")
+        if comma:
+            image_data = payload
+        del prefix, payload
 
         try:
-            image_bytes = base64.b64decode(image_data)
+            image_bytes = _b64decode(image_data)
         except Exception:
             return None, "Invalid base64 image"
+        del image_data
 
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        img = _decode_image_bytes(image_bytes, reduced)
         if img is None:
             return None, "Failed to decode image"
         return img, None
@@ -144,6 +543,28 @@ def _read_image_from_request():
     return None, "No image provided"
 
 
+def _encode_visualization(vis_image, quality=VISUALIZATION_JPEG_QUALITY):
+    """
+    Encode a visualization overlay as JPEG.
+    Overlays are diagnostic, so lossy JPEG is fine and far cheaper than PNG.
+    Returns the encoded buffer (np.uint8 array).
+    """
+    ok, buffer = cv2.imencode(".jpg", vis_image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Failed to encode visualization")
+    return buffer
+
+
+def _visualization_base64(vis_image):
+    """JPEG-encode a visualization overlay and return it as a base64 string"""
+    return _b64encode_str(_encode_visualization(vis_image))
+
+
+def _render_visualization_base64(img, calibration):
+    """Draw the segment overlay for `calibration` on a copy of img and return it as a base64 string"""
+    return _visualization_base64(seven_segment_ocr.visualize_segments_with_binary(img, calibration=calibration))
+
+
 def _calc_mm_from_lines(width_line1, width_line2, height_line1, height_line2, calibration_factor):
     """
     Simple mm computation without manual_measurement_utils:
@@ -191,29 +612,27 @@ def shape_detect_measure():
     """
     try:
         if "image" not in request.files:
-            return jsonify({"success": False, "error": "No image file"}), 400
-
-        image_bytes = request.files["image"].read()
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if img is None:
-            return jsonify({"success": False, "error": "Failed to decode image"}), 400
+            return _error_response("No image file", 400)
 
+        # Parse params before decoding so a bad request costs no decode
         params_raw = request.form.get("params", "")
         params = {}
         if params_raw:
             try:
-                params = json.loads(params_raw)
+                params = app.json.loads(params_raw)
             except Exception:
-                return jsonify({"success": False, "error": "Invalid params JSON"}), 400
+                return _error_response("Invalid params JSON", 400)
+
+        img = _decode_upload(request.files["image"])
+        if img is None:
+            return _error_response("Failed to decode image", 400)
 
         result = run_shape_detect(img, params)
         return jsonify(result)
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"success": False, "error": str(e)}), 500
+        log.exception("shape_detect_measure failed")
+        return _error_response(str(e))
 
 # ============================================================================
 # CALIBRATION HELPER
@@ -251,13 +670,14 @@ def calculate_calibration():
             reference_mm = float(data.get("referenceMillimeters", 10))
 
             if reference_pixels <= 0:
-                return jsonify({"error": "Reference pixels must be > 0", "success": False}), 400
+                return _error_response("Reference pixels must be > 0", 400)
 
             calibration_factor = reference_mm / reference_pixels
 
         return jsonify({"calibrationFactor": calibration_factor, "method": method, "success": True})
     except Exception as e:
-        return jsonify({"error": str(e), "success": False}), 500
+        log.exception("calculate_calibration failed")
+        return _error_response(str(e))
 
 
 # ============================================================================
@@ -266,11 +686,12 @@ def calculate_calibration():
 @app.route("/seven-segment/calibrate", methods=["POST"])
 def calibrate_seven_segment():
     """Save seven-segment calibration with decimal support"""
+    global _calibration_source
     try:
         data = request.get_json() or {}
 
         if "displayBox" not in data:
-            return jsonify({"error": "displayBox required", "success": False}), 400
+            return _error_response("displayBox required", 400)
 
         display_box = data["displayBox"]
 
@@ -281,7 +702,7 @@ def calibrate_seven_segment():
             segment_boxes = data["segmentBoxes"]
 
         if len(segment_boxes) != 3:
-            return jsonify({"error": "Expected 3 digits", "success": False}), 400
+            return _error_response("Expected 3 digits", 400)
 
         has_decimal_point = data.get("hasDecimalPoint", False)
         decimal_position = data.get("decimalPosition", 1)
@@ -307,13 +728,14 @@ def calibrate_seven_segment():
             decimal_position=decimal_position,
         )
         seven_segment_ocr.calibration["calibration_image_size"] = calibration_image_size
+        # Wizard draft only: the snapshot holds Laravel's active record
+        _calibration_source = "calibrate"
 
         return jsonify({"success": True, "message": "Calibration saved", "calibration": calibration_data})
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e), "success": False}), 500
+        log.exception("calibrate_seven_segment failed")
+        return _error_response(str(e))
 
 
 # ============================================================================
@@ -331,51 +753,23 @@ def recognize_seven_segment():
     """
     try:
         if seven_segment_ocr.calibration is None:
-            print("⚠️ Loading calibration from Laravel...")
+            log.info("⚠️ Loading calibration from Laravel...")
             if not load_calibration_from_laravel():
-                return jsonify({"error": "No calibration found. Please calibrate first.", "success": False}), 400
-
-        debug_mode = False
-        detection_method = "smart_adaptive"
+                return _error_response("No calibration found. Please calibrate first.", 400)
 
-        img, err = _read_image_from_request()
+        img, err = _read_image_from_request(reduced=_fast_decode_requested())
         if err:
-            return jsonify({"error": err, "success": False}), 400
-
-        if "debug" in request.form:
-            debug_mode = request.form.get("debug", "false").lower() == "true"
-        if "method" in request.form:
-            detection_method = request.form.get("method", "smart_adaptive")
-
-        if request.is_json:
-            data = request.get_json(silent=True) or {}
-            debug_mode = bool(data.get("debug", False))
-            detection_method = data.get("method", "smart_adaptive")
-
-        seven_segment_ocr.detection_method = detection_method
-        result = seven_segment_ocr.recognize_display(img, debug=debug_mode)
-
-        def convert_to_native(obj):
-            if isinstance(obj, dict):
-                return {key: convert_to_native(value) for key, value in obj.items()}
-            if isinstance(obj, list):
-                return [convert_to_native(item) for item in obj]
-            if isinstance(obj, np.bool_):
-                return bool(obj)
-            if isinstance(obj, np.integer):
-                return int(obj)
-            if isinstance(obj, np.floating):
-                return float(obj)
-            if isinstance(obj, np.ndarray):
-                return obj.tolist()
-            return obj
-
-        return jsonify(convert_to_native(result))
+            return _error_response(err, 400)
+
+        debug_mode = _request_flag("debug")
+        detection_method = _request_option("method", "smart_adaptive")
+
+        result = seven_segment_ocr.recognize_display(img, debug=debug_mode, method=detection_method)
+        return jsonify(result)
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e), "success": False}), 500
+        log.exception("recognize_seven_segment failed")
+        return _error_response(str(e))
 
 
 # ============================================================================
@@ -383,71 +777,83 @@ def recognize_seven_segment():
 # ============================================================================
 @app.route("/seven-segment/diagnose", methods=["POST"])
 def diagnose_seven_segment():
-    """Diagnose segment brightness values to debug detection issues"""
+    """
+    Diagnose segment brightness values to debug detection issues.
+    Per-segment median is only included with full_stats=true.
+    """
     try:
         if seven_segment_ocr.calibration is None:
             if not load_calibration_from_laravel():
-                return jsonify({"error": "No calibration found", "success": False}), 400
+                return _error_response("No calibration found", 400)
 
         img, err = _read_image_from_request()
         if err:
-            return jsonify({"error": err, "success": False}), 400
+            return _error_response(err, 400)
+
+        # One calibration snapshot for the whole request
+        calibration = seven_segment_ocr.calibration
+        num_digits = len(calibration["segment_boxes"])
+        full_stats = _request_flag("full_stats")
+
+        # Render and encode the overlay in the background while the stats are built
+        vis_future = image_executor.submit(_render_visualization_base64, img, calibration)
 
-        display_region = seven_segment_ocr.extract_display_region(img, seven_segment_ocr.calibration["display_box"])
+        display_region = seven_segment_ocr.extract_display_region(img, calibration["display_box"])
         gray_image = seven_segment_ocr.preprocess_image(display_region)
-        is_inverted = seven_segment_ocr.detect_display_inversion(gray_image)
+
+        # Whole-display stats in two OpenCV passes (mean, then min+max)
+        display_mean = cv2.mean(gray_image)[0]
+        display_min, display_max, _, _ = cv2.minMaxLoc(gray_image)
+        is_inverted = seven_segment_ocr.detect_display_inversion(gray_image, mean_brightness=display_mean)
 
         diagnostics = {
             "display_inverted": is_inverted,
-            "display_mean_brightness": float(np.mean(gray_image)),
-            "display_min": float(np.min(gray_image)),
-            "display_max": float(np.max(gray_image)),
-            "total_digits": len(seven_segment_ocr.calibration["segment_boxes"]),
+            "display_mean_brightness": display_mean,
+            "display_min": display_min,
+            "display_max": display_max,
+            "total_digits": num_digits,
             "digits": [],
         }
 
         segment_labels = ["A", "B", "C", "D", "E", "F", "G"]
 
-        for digit_idx, segment_boxes in enumerate(seven_segment_ocr.calibration["segment_boxes"]):
-            digit_info = {"digit_index": digit_idx, "segments": []}
-
-            for seg_idx, box in enumerate(segment_boxes):
-                x = int(box["x"] - seven_segment_ocr.calibration["display_box"]["x"])
-                y = int(box["y"] - seven_segment_ocr.calibration["display_box"]["y"])
-                w = int(box["width"])
-                h = int(box["height"])
-
-                x = max(0, min(x, gray_image.shape[1] - 1))
-                y = max(0, min(y, gray_image.shape[0] - 1))
-                w = max(1, min(w, gray_image.shape[1] - x))
-                h = max(1, min(h, gray_image.shape[0] - y))
+        # All segment ROIs in one batch: (digits * 7, 4) rects -> per-stat arrays.
+        # The median is the only per-ROI sort/histogram, so it is opt-in (full_stats=true).
+        stats = segment_roi_stats(
+            gray_image, seven_segment_ocr.segment_rects(gray_image.shape, calibration), median=full_stats
+        )
+        stats = {name: values.reshape(-1, 7).tolist() for name, values in stats.items()}
+        medians = stats.get("median")
 
-                segment_roi = gray_image[y:y + h, x:x + w]
-                mean_val = float(np.mean(segment_roi))
-                state = 1 if mean_val > 128 else 0
+        for digit_idx in range(num_digits):
+            digit_info = {"digit_index": digit_idx, "segments": []}
 
-                digit_info["segments"].append({
-                    "name": segment_labels[seg_idx],
+            for seg_idx, name in enumerate(segment_labels):
+                mean_val = stats["mean"][digit_idx][seg_idx]
+                segment = {
+                    "name": name,
                     "mean": mean_val,
-                    "state": state,
-                    "min": float(np.min(segment_roi)),
-                    "max": float(np.max(segment_roi)),
-                    "median": float(np.median(segment_roi)),
-                    "std": float(np.std(segment_roi)),
-                })
+                    "state": 1 if mean_val > 128 else 0,
+                    "min": stats["min"][digit_idx][seg_idx],
+                    "max": stats["max"][digit_idx][seg_idx],
+                    "std": stats["std"][digit_idx][seg_idx],
+                }
+                if medians is not None:
+                    segment["median"] = medians[digit_idx][seg_idx]
+                digit_info["segments"].append(segment)
 
             diagnostics["digits"].append(digit_info)
 
-        vis_image = seven_segment_ocr.visualize_segments_with_binary(img)
-        _, buffer = cv2.imencode(".png", vis_image)
-        vis_base64 = base64.b64encode(buffer).decode("utf-8")
-
-        return jsonify({"success": True, "diagnostics": diagnostics, "visualization": vis_base64})
+        return jsonify({
+            "success": True,
+            "diagnostics": diagnostics,
+            "visualization": vis_future.result(),
+            "visualizationFormat": "jpeg",
+        })
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e), "success": False}), 500
+        log.exception("diagnose_seven_segment failed")
+        return _error_response(str(e))
 
 
 # ============================================================================
@@ -459,26 +865,37 @@ def visualize_seven_segment():
     Visualize segment boxes with binary states (0/1)
     GREEN box + "1" = Segment ON
     RED box + "0" = Segment OFF
+    Returns base64 JPEG in JSON, or the raw JPEG when Accept: image/jpeg.
+    fast=true decodes the frame at half size (overlay is half size too).
     """
     try:
         if seven_segment_ocr.calibration is None:
             if not load_calibration_from_laravel():
-                return jsonify({"error": "No calibration found", "success": False}), 400
+                return _error_response("No calibration found", 400)
 
-        img, err = _read_image_from_request()
+        img, err = _read_image_from_request(reduced=_fast_decode_requested())
         if err:
-            return jsonify({"error": err, "success": False}), 400
+            return _error_response(err, 400)
 
-        vis_image = seven_segment_ocr.visualize_segments_with_binary(img)
-        _, buffer = cv2.imencode(".png", vis_image)
-        vis_base64 = base64.b64encode(buffer).decode("utf-8")
+        vis_image = seven_segment_ocr.visualize_segments_with_binary(img, inplace=True)
+        buffer = _encode_visualization(vis_image, VISUALIZE_JPEG_QUALITY)
 
-        return jsonify({"success": True, "visualization": vis_base64, "method": "simple_threshold"})
+        # Clients that only want the image (Accept: image/jpeg) skip base64 + JSON
+        if request.accept_mimetypes.best_match(["application/json", "image/jpeg"]) == "image/jpeg":
+            return Response(buffer.tobytes(), mimetype="image/jpeg")
+
+        vis_base64 = _b64encode_str(buffer)
+
+        return jsonify({
+            "success": True,
+            "visualization": vis_base64,
+            "visualizationFormat": "jpeg",
+            "method": "simple_threshold",
+        })
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e), "success": False}), 500
+        log.exception("visualize_seven_segment failed")
+        return _error_response(str(e))
 
 # ============================================================================
 # GET CALIBRATION
@@ -495,36 +912,81 @@ def get_seven_segment_calibration():
         if seven_segment_ocr.calibration is not None:
             return jsonify({"success": True, "calibration": seven_segment_ocr.calibration, "source": "flask_memory"})
 
-        print("📄 Trying Laravel...")
+        log.info("📄 Trying Laravel...")
         if load_calibration_from_laravel():
             return jsonify({"success": True, "calibration": seven_segment_ocr.calibration, "source": "laravel_database"})
 
         return jsonify({"success": False, "message": "No calibration found", "source": "none"}), 404
 
     except Exception as e:
-        return jsonify({"error": str(e), "success": False}), 500
+        log.exception("get_seven_segment_calibration failed")
+        return _error_response(str(e))
+
+
+@app.route("/seven-segment/calibration/refresh", methods=["POST"])
+def refresh_seven_segment_calibration():
+    """
+    Force a reload of the active calibration from Laravel
+    (also rewrites the local calibration snapshot)
+    ---
+    tags:
+      - Seven-Segment OCR
+    """
+    try:
+        if load_calibration_from_laravel(force=True):
+            return jsonify({"success": True, "calibration": seven_segment_ocr.calibration, "source": "laravel_database"})
+
+        return jsonify({"success": False, "message": "No calibration found", "source": "none"}), 404
+
+    except Exception as e:
+        log.exception("refresh_seven_segment_calibration failed")
+        return _error_response(str(e))
 
 # ============================================================================
 # ACTUATOR CALIBRATION ENDPOINTS (Laravel Proxy)
 # ============================================================================
+# UI polls GET /actuator-calibration; reuse Laravel's answer for a few seconds.
+# Every mutating actuator route clears it and bumps the generation, so a GET
+# that was already in flight cannot store the pre-change answer afterwards.
+ACTUATOR_CACHE_TTL = 5.0
+_actuator_cache = None  # (expires_at, body, status)
+_actuator_cache_generation = 0
+_actuator_cache_lock = threading.Lock()
+
+
+def _clear_actuator_cache():
+    """Drop the cached GET /actuator-calibration answer"""
+    global _actuator_cache, _actuator_cache_generation
+    with _actuator_cache_lock:
+        _actuator_cache = None
+        _actuator_cache_generation += 1
+
+
 @app.route("/actuator-calibration", methods=["GET"])
 def get_actuator_calibration():
-    """Get active actuator calibration from Laravel"""
+    """Get active actuator calibration from Laravel (cached for ACTUATOR_CACHE_TTL seconds)"""
+    global _actuator_cache
+    cached = _actuator_cache
+    if cached is not None and time.monotonic() < cached[0]:
+        return Response(cached[1], status=cached[2], mimetype="application/json")
+
+    generation = _actuator_cache_generation
     try:
-        response = requests.get(f"{LARAVEL_API_URL}/api/actuator-calibration/active", timeout=5)
+        response = laravel_request("GET", "/api/actuator-calibration/active")
 
         if response.status_code == 404:
-            return jsonify({"success": False, "message": "No active calibration found"}), 404
+            body, status = app.json.dumps({"success": False, "message": "No active calibration found"}), 404
+        else:
+            response.raise_for_status()
+            body, status = _laravel_json_body(response), 200
 
-        response.raise_for_status()
-        return jsonify(response.json())
+        with _actuator_cache_lock:
+            if _actuator_cache_generation == generation:
+                _actuator_cache = (time.monotonic() + ACTUATOR_CACHE_TTL, body, status)
+        return Response(body, status=status, mimetype="application/json")
 
     except requests.exceptions.RequestException as e:
-        return jsonify({
-            "success": False,
-            "error": "Failed to connect to Laravel API",
-            "details": str(e),
-        }), 500
+        return _laravel_error(e)
 
 
 @app.route("/actuator-calibration/set-midpoint", methods=["POST"])
@@ -533,24 +995,28 @@ def set_actuator_midpoint():
     try:
         data = request.get_json() or {}
         if "midpoint" not in data:
-            return jsonify({"success": False, "error": "Missing midpoint parameter"}), 400
+            return _error_response("Missing midpoint parameter", 400)
 
         midpoint = data["midpoint"]
         if midpoint == 0:
-            return jsonify({"success": False, "error": "Midpoint cannot be 0"}), 400
+            return _error_response("Midpoint cannot be 0", 400)
 
-        response = requests.post(
-            f"{LARAVEL_API_URL}/api/actuator-calibration/set-midpoint",
-            json={"midpoint": midpoint},
-            timeout=5
-        )
+        # Clear even on error/timeout: Laravel may have applied the change
+        try:
+            response = laravel_request(
+                "POST", "/api/actuator-calibration/set-midpoint",
+                json={"midpoint": midpoint},
+            )
+        finally:
+            _clear_actuator_cache()
         response.raise_for_status()
-        return jsonify(response.json())
+        return _laravel_passthrough(response)
 
     except requests.exceptions.RequestException as e:
-        return jsonify({"success": False, "error": "Failed to connect to Laravel API", "details": str(e)}), 500
+        return _laravel_error(e)
     except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+        log.exception("set_actuator_midpoint failed")
+        return _error_response(str(e))
 
 
 @app.route("/actuator-calibration/set-limits", methods=["POST"])
@@ -559,28 +1025,32 @@ def set_actuator_limits():
     try:
         data = request.get_json() or {}
         if "current_position" not in data or "direction" not in data:
-            return jsonify({"success": False, "error": "Missing required parameters (current_position, direction)"}), 400
+            return _error_response("Missing required parameters (current_position, direction)", 400)
 
         direction = data["direction"]
         if direction not in ["left", "right"]:
-            return jsonify({"success": False, "error": 'Direction must be "left" or "right"'}), 400
+            return _error_response('Direction must be "left" or "right"', 400)
 
         current_position = data["current_position"]
         if current_position == 0:
-            return jsonify({"success": False, "error": f"{direction.capitalize()} limit position cannot be 0"}), 400
+            return _error_response(f"{direction.capitalize()} limit position cannot be 0", 400)
 
-        response = requests.post(
-            f"{LARAVEL_API_URL}/api/actuator-calibration/set-limits",
-            json={"current_position": current_position, "direction": direction},
-            timeout=5
-        )
+        # Clear even on error/timeout: Laravel may have applied the change
+        try:
+            response = laravel_request(
+                "POST", "/api/actuator-calibration/set-limits",
+                json={"current_position": current_position, "direction": direction},
+            )
+        finally:
+            _clear_actuator_cache()
         response.raise_for_status()
-        return jsonify(response.json())
+        return _laravel_passthrough(response)
 
     except requests.exceptions.RequestException as e:
-        return jsonify({"success": False, "error": "Failed to connect to Laravel API", "details": str(e)}), 500
+        return _laravel_error(e)
     except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+        log.exception("set_actuator_limits failed")
+        return _error_response(str(e))
 
 
 @app.route("/actuator-calibration/validate-position", methods=["POST"])
@@ -589,34 +1059,67 @@ def validate_actuator_position():
     try:
         data = request.get_json() or {}
         if "position" not in data:
-            return jsonify({"success": False, "error": "Missing position parameter"}), 400
+            return _error_response("Missing position parameter", 400)
 
-        response = requests.post(
-            f"{LARAVEL_API_URL}/api/actuator-calibration/validate-position",
+        response = laravel_request(
+            "POST", "/api/actuator-calibration/validate-position",
             json={"position": data["position"]},
-            timeout=5
         )
         response.raise_for_status()
-        return jsonify(response.json())
+        return _laravel_passthrough(response)
 
     except requests.exceptions.RequestException as e:
-        return jsonify({"success": False, "error": "Failed to connect to Laravel API", "details": str(e)}), 500
+        return _laravel_error(e)
     except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+        log.exception("validate_actuator_position failed")
+        return _error_response(str(e))
 
 
 @app.route("/actuator-calibration/reset", methods=["POST"])
 def reset_actuator_calibration():
     """Reset actuator calibration"""
     try:
-        response = requests.post(f"{LARAVEL_API_URL}/api/actuator-calibration/reset", timeout=5)
+        # Clear even on error/timeout: Laravel may have applied the change
+        try:
+            response = laravel_request("POST", "/api/actuator-calibration/reset")
+        finally:
+            _clear_actuator_cache()
         response.raise_for_status()
-        return jsonify(response.json())
+        return _laravel_passthrough(response)
 
     except requests.exceptions.RequestException as e:
-        return jsonify({"success": False, "error": "Failed to connect to Laravel API", "details": str(e)}), 500
+        return _laravel_error(e)
     except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+        log.exception("reset_actuator_calibration failed")
+        return _error_response(str(e))
+
+
+# ============================================================================
+# WARM-UP
+# ============================================================================
+def _warm_up():
+    """Run the image pipeline once on a dummy frame so the first request is not slow"""
+    start = time.perf_counter()
+    try:
+        dummy = np.zeros((120, 240, 3), dtype=np.uint8)
+        _, jpeg = cv2.imencode(".jpg", dummy)
+        frame = _decode_image_bytes(jpeg.tobytes())
+
+        # Throwaway instance so the shared calibration is never touched
+        ocr = SevenSegmentOCR()
+        display_box = {"x": 0, "y": 0, "width": 240, "height": 120}
+        ocr.set_calibration(display_box, create_default_segment_boxes(display_box))
+        ocr.recognize_display(frame)
+        _visualization_base64(ocr.visualize_segments_with_binary(frame))
+
+        run_shape_detect(frame, {})
+        log.info("🔥 Warm-up done in %.0f ms", (time.perf_counter() - start) * 1000)
+    except Exception:
+        log.exception("⚠️ Warm-up skipped")
+
+
+# Runs at import so gunicorn's preload_app shares the warm state with workers
+_warm_up()
 
 
 # ============================================================================
@@ -641,6 +1144,7 @@ if __name__ == "__main__":
     print("  POST /seven-segment/visualize")
     print("  POST /seven-segment/recognize")
     print("  GET  /seven-segment/calibration")
+    print("  POST /seven-segment/calibration/refresh")
     print("  GET  /actuator-calibration")
     print("  POST /actuator-calibration/set-midpoint")
     print("  POST /actuator-calibration/set-limits")
@@ -649,4 +1153,8 @@ if __name__ == "__main__":
     print("  GET  /health")
     print("=" * 60)
 
-    app.run(debug=True, host="0.0.0.0", port=5000)
+    preload_calibration()
+
+    # Development server only; set FLASK_DEBUG=1 for the reloader/debugger.
+    # Production: see wsgi.py (gunicorn on Linux/macOS, waitress on Windows).
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1", host="0.0.0.0", port=5000, threaded=True)
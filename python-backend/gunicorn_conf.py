@@ -0,0 +1,41 @@
+"""
+gunicorn_conf.py
+Production server settings for the TimberMach Flask backend (Linux/macOS).
+
+    cd python-backend
+    gunicorn -c gunicorn_conf.py wsgi:app
+
+Seven-segment calibration posted to /seven-segment/calibrate lives in
+process memory, so the default is ONE worker with several threads.
+OpenCV releases the GIL while decoding/filtering, so threads still run
+image requests in parallel. Only raise GUNICORN_WORKERS if every worker
+can load its calibration from Laravel.
+"""
+
+import os
+
+# No Swagger UI / spec routes in production unless explicitly enabled
+os.environ.setdefault("ENABLE_SWAGGER", "0")
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+
+workers = int(os.environ.get("GUNICORN_WORKERS", 1))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", 2 * (os.cpu_count() or 1)))
+
+# Several worker processes already spread requests over the cores, so keep
+# each OpenCV call single-threaded instead of oversubscribing them
+if workers > 1:
+    os.environ.setdefault("OPENCV_THREADS", "1")
+
+# Only used by async worker classes (gevent / eventlet)
+worker_connections = 1000
+
+# Import OpenCV/NumPy and build the OCR singleton once in the master
+preload_app = True
+
+
+def post_worker_init(worker):
+    # Laravel calibration fetch runs per worker, after the fork
+    from app import preload_calibration
+    preload_calibration()
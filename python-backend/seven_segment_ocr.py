@@ -5,6 +5,7 @@ Handles both light-on-dark and dark-on-light displays
 """
 
 import json
+import threading
 from typing import Dict, List, Optional, Tuple
 
 import cv2
@@ -40,6 +41,10 @@ class SevenSegmentOCR:
         self.has_decimal_point = True
         self.decimal_position = 1
 
+        # (calibration, {shape: clamped segment rects}), swapped as one tuple
+        # so a recalibration can never pair a calibration with another's rects
+        self._rects_state = (None, {})
+
     def set_calibration(
         self,
         display_box: Dict,
@@ -149,6 +154,33 @@ class SevenSegmentOCR:
 
         return scaled_calibration
 
+    def segment_rects(
+        self, shape: Tuple[int, ...], calibration: Optional[Dict] = None
+    ) -> np.ndarray:
+        """
+        Clamped (x, y, w, h) rects of the calibrated segment boxes relative to
+        the display box, for a display region of the given shape.
+        Pass `calibration` to pin a snapshot (defaults to the current one).
+        Cached per shape until the calibration object changes; read-only.
+        """
+        if calibration is None:
+            calibration = self.calibration
+
+        cached_calibration, cache = self._rects_state
+        if cached_calibration is not calibration:
+            cache = {}
+            self._rects_state = (calibration, cache)
+
+        key = tuple(shape[:2])
+        rects = cache.get(key)
+        if rects is None:
+            rects = clamp_segment_rects(
+                calibration["segment_boxes"], calibration["display_box"], key
+            )
+            rects.setflags(write=False)
+            cache[key] = rects
+        return rects
+
     def extract_display_region(
         self, image: np.ndarray, display_box: Dict
     ) -> np.ndarray:
@@ -161,30 +193,39 @@ class SevenSegmentOCR:
         return image[y : y + h, x : x + w]
 
     def preprocess_image(self, image: np.ndarray) -> np.ndarray:
-        """Preprocess image for segment detection"""
+        """
+        Preprocess image for segment detection.
+        Intermediate images go into per-thread scratch buffers; only the
+        returned array is freshly allocated.
+        """
+        shape = image.shape[:2]
+
         if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=_scratch_buffer("gray", shape))
         else:
-            gray = image.copy()
+            gray = image
 
         # Apply CLAHE for better contrast
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(gray)
+        enhanced = _thread_clahe().apply(gray, dst=_scratch_buffer("enhanced", shape))
 
         # Apply bilateral filter
-        denoised = cv2.bilateralFilter(enhanced, 9, 75, 75)
+        denoised = cv2.bilateralFilter(enhanced, 9, 75, 75, dst=_scratch_buffer("denoised", shape))
 
         # Increase contrast
         denoised = cv2.convertScaleAbs(denoised, alpha=1.5, beta=0)
 
         return denoised
 
-    def detect_display_inversion(self, gray_image: np.ndarray) -> bool:
+    def detect_display_inversion(
+        self, gray_image: np.ndarray, mean_brightness: Optional[float] = None
+    ) -> bool:
         """
         Detect if display is light-on-dark or dark-on-light
         Returns True if display is inverted (dark digits on light background)
+        Pass mean_brightness if the caller already has it to skip another pass.
         """
-        mean_brightness = np.mean(gray_image)
+        if mean_brightness is None:
+            mean_brightness = cv2.mean(gray_image)[0]
         return mean_brightness > 127
 
     def detect_segment_simple_threshold(
@@ -211,11 +252,13 @@ class SevenSegmentOCR:
         if gray_roi.size == 0:
             return False, {"error": "Empty ROI"}
 
-        # Calculate statistics
-        mean_brightness = float(np.mean(gray_roi))
-        median_brightness = float(np.median(gray_roi))
-        min_val = float(np.min(gray_roi))
-        max_val = float(np.max(gray_roi))
+        # Calculate statistics (one histogram of the uint8 ROI)
+        n = gray_roi.size
+        hist, cdf = _uint8_histogram(gray_roi)
+        mean_brightness = float(hist @ _LEVELS / n)
+        median_brightness = _hist_median(cdf, n)
+        min_val = float(_rank_value(cdf, 0))
+        max_val = float(_rank_value(cdf, n - 1))
 
         # FIXED THRESHOLD LOGIC
         # For your display: WHITE segments = ON, BLACK background = OFF
@@ -253,25 +296,31 @@ class SevenSegmentOCR:
         if gray_roi.size == 0:
             return False, {"error": "Empty ROI"}
 
+        # All statistics come from one 256-bin histogram of the uint8 ROI,
+        # instead of a separate sort/partition per percentile
+        n = gray_roi.size
+        hist, cdf = _uint8_histogram(gray_roi)
+
         # Calculate statistics
-        mean_brightness = float(np.mean(gray_roi))
-        median_brightness = float(np.median(gray_roi))
-        min_val = float(np.min(gray_roi))
-        max_val = float(np.max(gray_roi))
+        mean_brightness = float(hist @ _LEVELS / n)
+        median_brightness = _hist_median(cdf, n)
+        min_val = float(_rank_value(cdf, 0))
+        max_val = float(_rank_value(cdf, n - 1))
 
         # Calculate percentiles
-        p10 = float(np.percentile(gray_roi, 10))
-        p25 = float(np.percentile(gray_roi, 25))
-        p75 = float(np.percentile(gray_roi, 75))
-        p90 = float(np.percentile(gray_roi, 90))
+        p10 = _hist_percentile(cdf, n, 10)
+        p25 = _hist_percentile(cdf, n, 25)
+        p75 = _hist_percentile(cdf, n, 75)
+        p90 = _hist_percentile(cdf, n, 90)
 
         # Calculate contrast
         contrast = p90 - p10
 
         if is_inverted:
-            # Dark digits on light background
-            dark_pixels = gray_roi[gray_roi < p25]
-            mean_dark = float(np.mean(dark_pixels)) if len(dark_pixels) > 0 else min_val
+            # Dark digits on light background: pixels below p25
+            k = int(np.ceil(p25))
+            dark_count = cdf[k - 1] if k > 0 else 0
+            mean_dark = float(hist[:k] @ _LEVELS[:k] / dark_count) if dark_count > 0 else min_val
 
             is_on = (
                 contrast > 30
@@ -279,10 +328,11 @@ class SevenSegmentOCR:
                 and mean_brightness < 150
             )
         else:
-            # Light digits on dark background
-            bright_pixels = gray_roi[gray_roi > p75]
+            # Light digits on dark background: pixels above p75
+            k = int(np.floor(p75)) + 1
+            bright_count = n - cdf[k - 1]
             mean_bright = (
-                float(np.mean(bright_pixels)) if len(bright_pixels) > 0 else max_val
+                float(hist[k:] @ _LEVELS[k:] / bright_count) if bright_count > 0 else max_val
             )
 
             is_on = (
@@ -378,8 +428,17 @@ class SevenSegmentOCR:
 
         return digit, binary_string, segment_states, debug_info_list
 
-    def recognize_display(self, image: np.ndarray, debug: bool = False) -> Dict:
-        """Recognize full display using calibration"""
+    def recognize_display(
+        self, image: np.ndarray, debug: bool = False, method: str = None
+    ) -> Dict:
+        """
+        Recognize full display using calibration.
+        `method` overrides detection_method for this call only, so a shared
+        instance can serve concurrent requests without mutating its state.
+        """
+        if method is None:
+            method = self.detection_method
+
         if self.calibration is None:
             raise ValueError("No calibration data loaded. Please calibrate first.")
 
@@ -419,7 +478,7 @@ class SevenSegmentOCR:
                 segment_boxes,
                 scaled_calibration["display_box"],
                 is_inverted=is_inverted,
-                method=self.detection_method,
+                method=method,
             )
 
             digit_result = {
@@ -486,7 +545,7 @@ class SevenSegmentOCR:
 
         if debug:
             response["debug_info"] = {
-                "detection_method": self.detection_method,
+                "detection_method": method,
                 "display_is_inverted": is_inverted,
                 "display_mean_brightness": float(np.mean(gray_image)),
                 "display_std_dev": float(np.std(gray_image)),
@@ -495,19 +554,26 @@ class SevenSegmentOCR:
 
         return response
 
-    def visualize_segments_with_binary(self, image: np.ndarray) -> np.ndarray:
+    def visualize_segments_with_binary(
+        self, image: np.ndarray, inplace: bool = False, calibration: Optional[Dict] = None
+    ) -> np.ndarray:
         """
         Draw segment boxes with binary state (0/1) visualization
         GREEN box + "1" = Segment ON
         RED box + "0" = Segment OFF
+        inplace=True draws on `image` itself (skips a full-frame copy) when
+        the caller does not need the original pixels afterwards.
+        Pass `calibration` to pin a snapshot (defaults to the current one).
         """
-        if self.calibration is None:
+        if calibration is None:
+            calibration = self.calibration
+        if calibration is None:
             return image
 
-        vis_image = image.copy()
+        vis_image = image if inplace else image.copy()
 
         # Scale calibration to match current image size
-        scaled_calibration = self.scale_boxes_to_image(image, self.calibration)
+        scaled_calibration = self.scale_boxes_to_image(image, calibration)
 
         # Extract and preprocess display region
         display_region = self.extract_display_region(
@@ -611,6 +677,149 @@ class SevenSegmentOCR:
         return self.visualize_segments_with_binary(image)
 
 
+# Per-thread CLAHE object and scratch images for preprocess_image
+_thread_state = threading.local()
+
+
+def _thread_clahe():
+    """CLAHE instance owned by the calling thread (built once per thread)"""
+    clahe = getattr(_thread_state, "clahe", None)
+    if clahe is None:
+        clahe = _thread_state.clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+    return clahe
+
+
+def _scratch_buffer(name: str, shape: Tuple[int, int]) -> np.ndarray:
+    """Reusable uint8 image of the given shape, private to the calling thread"""
+    buffers = getattr(_thread_state, "buffers", None)
+    if buffers is None:
+        buffers = _thread_state.buffers = {}
+    buf = buffers.get(name)
+    if buf is None or buf.shape != shape:
+        buf = buffers[name] = np.empty(shape, dtype=np.uint8)
+    return buf
+
+
+def clamp_segment_rects(
+    segment_boxes: List[List[Dict]], display_box: Dict, shape: Tuple[int, ...]
+) -> np.ndarray:
+    """
+    Convert calibrated segment boxes to integer (x, y, w, h) rects relative
+    to the display region, clamped to an image of the given shape.
+    Returns an (N, 4) int array in digit-major, A-G order.
+    """
+    boxes = np.array(
+        [
+            [box["x"], box["y"], box["width"], box["height"]]
+            for digit_boxes in segment_boxes
+            for box in digit_boxes
+        ],
+        dtype=np.float64,
+    ).reshape(-1, 4)
+
+    rects = np.empty(boxes.shape, dtype=np.int64)
+    rects[:, 0] = boxes[:, 0] - display_box["x"]
+    rects[:, 1] = boxes[:, 1] - display_box["y"]
+    rects[:, 2:] = boxes[:, 2:]
+
+    img_h, img_w = shape[:2]
+    rects[:, 0] = np.clip(rects[:, 0], 0, img_w - 1)
+    rects[:, 1] = np.clip(rects[:, 1], 0, img_h - 1)
+    rects[:, 2] = np.maximum(1, np.minimum(rects[:, 2], img_w - rects[:, 0]))
+    rects[:, 3] = np.maximum(1, np.minimum(rects[:, 3], img_h - rects[:, 1]))
+    return rects
+
+
+_LEVELS = np.arange(256, dtype=np.float64)
+
+
+def _uint8_histogram(roi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """256-bin histogram of a uint8 ROI and its cumulative sum (int64)"""
+    hist = cv2.calcHist([roi], [0], None, [256], [0, 256]).ravel().astype(np.int64)
+    return hist, np.cumsum(hist)
+
+
+def _rank_value(cdf: np.ndarray, k) -> int:
+    """Value of the k-th smallest pixel (0-based) from a cumulative histogram"""
+    return int(np.searchsorted(cdf, k, side="right"))
+
+
+def _hist_median(cdf: np.ndarray, n: int) -> float:
+    """Same result as np.median, from a cumulative histogram"""
+    return (_rank_value(cdf, (n - 1) // 2) + _rank_value(cdf, n // 2)) / 2.0
+
+
+def _hist_percentile(cdf: np.ndarray, n: int, q: float) -> float:
+    """Same result as np.percentile(..., q) (linear method), from a cumulative histogram"""
+    q = q / 100
+    # Index arithmetic mirrors numpy's so results match bit-for-bit
+    virtual = (n - 1) * q
+    if virtual >= n - 1:
+        return float(_rank_value(cdf, n - 1))
+    lo = int(np.floor(virtual))
+    gamma = virtual - lo
+    a = _rank_value(cdf, lo)
+    b = _rank_value(cdf, lo + 1)
+    # numpy's _lerp, including its switch for gamma >= 0.5
+    if gamma >= 0.5:
+        return float(b - (b - a) * (1 - gamma))
+    return float(a + (b - a) * gamma)
+
+
+def _uint8_median(roi: np.ndarray) -> float:
+    """Exact median of a uint8 ROI via a 256-bin histogram (no sort)"""
+    n = roi.size
+    if n < 64 or roi.dtype != np.uint8:
+        # Sorting a handful of pixels is cheaper than building a histogram
+        return float(np.median(roi))
+    _, cdf = _uint8_histogram(roi)
+    return _hist_median(cdf, n)
+
+
+def segment_roi_stats(
+    gray_image: np.ndarray, rects: np.ndarray, median: bool = True
+) -> Dict[str, np.ndarray]:
+    """
+    Brightness statistics for many segment ROIs at once.
+
+    Mean and std come from a single integral-image pass, so their cost does
+    not depend on the number or size of the segments. Min/max/median are
+    still taken per ROI (median from a histogram, not a sort; median=False
+    skips it). Returns a dict of (N,) float arrays.
+    """
+    sums, sq_sums = cv2.integral2(gray_image, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+
+    x0, y0 = rects[:, 0], rects[:, 1]
+    x1, y1 = x0 + rects[:, 2], y0 + rects[:, 3]
+    area = (rects[:, 2] * rects[:, 3]).astype(np.float64)
+
+    def _box_sum(table):
+        return table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+
+    mean = _box_sum(sums) / area
+    var = np.maximum(_box_sum(sq_sums) / area - mean * mean, 0.0)
+
+    n = len(rects)
+    mins = np.empty(n, dtype=np.float64)
+    maxs = np.empty(n, dtype=np.float64)
+    medians = np.empty(n, dtype=np.float64) if median else None
+    for i, (x, y, w, h) in enumerate(rects):
+        roi = gray_image[y : y + h, x : x + w]
+        mins[i], maxs[i], _, _ = cv2.minMaxLoc(roi)
+        if median:
+            medians[i] = _uint8_median(roi)
+
+    stats = {
+        "mean": mean,
+        "std": np.sqrt(var),
+        "min": mins,
+        "max": maxs,
+    }
+    if median:
+        stats["median"] = medians
+    return stats
+
+
 def create_default_segment_boxes(
     display_box: Dict, num_digits: int = 3
 ) -> List[List[Dict]]:
@@ -157,10 +157,23 @@ class ContourDetectionPipeline:
     def draw_crosshair(self, img, color=(128, 128, 128), thickness=1, alpha=0.45):
         h, w = img.shape[:2]
         cx, cy = w // 2, h // 2
-        overlay = img.copy()
-        cv2.line(overlay, (0, cy), (w, cy), color, thickness, cv2.LINE_AA)
-        cv2.line(overlay, (cx, 0), (cx, h), color, thickness, cv2.LINE_AA)
-        cv2.addWeighted(overlay, alpha, img, 1 - alpha, 0, img)
+
+        # Only the strips around the two axis-aligned lines change, so blend
+        # those (a horizontal band + the column above/below it) instead of
+        # copying and blending the whole frame. Each strip is drawn with
+        # `pad` extra rows so the AA line is not capped at the strip edge.
+        pad = thickness + 2
+        y0, y1 = max(0, cy - pad), min(h, cy + pad + 1)
+        x0, x1 = max(0, cx - pad), min(w, cx + pad + 1)
+        for ys, ye, xs, xe in ((y0, y1, 0, w), (0, y0, x0, x1), (y1, h, x0, x1)):
+            if ys >= ye or xs >= xe:
+                continue
+            ds, de = max(0, ys - pad), min(h, ye + pad)
+            overlay = img[ds:de, xs:xe].copy()
+            cv2.line(overlay, (-xs, cy - ds), (w - xs, cy - ds), color, thickness, cv2.LINE_AA)
+            cv2.line(overlay, (cx - xs, -ds), (cx - xs, h - ds), color, thickness, cv2.LINE_AA)
+            target = img[ys:ye, xs:xe]
+            target[...] = cv2.addWeighted(overlay[ys - ds : ye - ds], alpha, target, 1 - alpha, 0)
         return img
 
     def adjust_brightness_contrast(self, img, brightness=0, contrast=100):
@@ -247,22 +260,6 @@ class ContourDetectionPipeline:
 
     # ---------- Core: Stable Pipeline ----------
 
-    def _largest_component(self, bin_img):
-        """
-        Keep only the largest connected component in a binary image.
-        bin_img: 0/255
-        """
-        num_labels, labels, stats, _centroids = cv2.connectedComponentsWithStats(bin_img, connectivity=8)
-        if num_labels <= 1:
-            return bin_img
-
-        # label 0 is background
-        areas = stats[1:, cv2.CC_STAT_AREA]
-        best = 1 + int(np.argmax(areas))
-        out = np.zeros_like(bin_img)
-        out[labels == best] = 255
-        return out
-    
     def _largest_component(self, bin_img):
         """
         Keep only the largest connected component in a binary image.
@@ -276,9 +273,8 @@ class ContourDetectionPipeline:
         areas = stats[1:, cv2.CC_STAT_AREA]
         best = 1 + int(np.argmax(areas))
 
-        out = np.zeros_like(bin_img)
-        out[labels == best] = 255
-        return out
+        # 255 where labels == best, 0 elsewhere (one vectorized pass)
+        return cv2.compare(labels, best, cv2.CMP_EQ)
 
 
     def process_frame(self, img_bgr, params):
@@ -345,20 +341,14 @@ class ContourDetectionPipeline:
         # Find contours from the SOLID mask (ROI coords), then offset to full image coords
         contours_roi, _ = cv2.findContours(roi_obj, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
+        # Keep only the largest contour for stability (dominant contour),
+        # if it clears min_area; each area is computed once
         contours_full = []
-        for c in contours_roi:
-            area = cv2.contourArea(c)
-            if area < params["min_area"]:
-                continue
-            c2 = c.copy()
-            c2[:, 0, 0] += roi_x
-            c2[:, 0, 1] += roi_y
-            contours_full.append(c2)
-
-        # If multiple remain, keep largest for stability (dominant contour)
-        contours_full.sort(key=cv2.contourArea, reverse=True)
-        if len(contours_full) > 1:
-            contours_full = contours_full[:1]
+        if contours_roi:
+            areas = np.fromiter((cv2.contourArea(c) for c in contours_roi), dtype=np.float64, count=len(contours_roi))
+            best = int(np.argmax(areas))
+            if areas[best] >= params["min_area"]:
+                contours_full.append(contours_roi[best] + np.array([roi_x, roi_y], dtype=contours_roi[best].dtype))
 
         # Visualization image
         img_vis = img_adj.copy()
@@ -7,6 +7,13 @@ from typing import Dict, Any, Optional, Tuple
 import cv2
 import numpy as np
 
+# SIMD base64 encoder (optional; falls back to the stdlib codec)
+try:
+    from pybase64 import b64encode_as_string as _b64encode_str
+except ImportError:
+    def _b64encode_str(data):
+        return base64.b64encode(data).decode("ascii")
+
 
 def _load_shape_detect_module():
     """Load shape-detect.py (hyphenated filename) as a Python module."""
@@ -40,40 +47,26 @@ DEFAULT_PARAMS = {
     "edge_thickness": 2,
 }
 
+# Overlays are camera frames with a few drawn lines; JPEG is ~5-10x smaller
+# than PNG and much faster to encode.
+OVERLAY_JPEG_QUALITY = 85
+
 
 def _ensure_odd(k: int) -> int:
     k = max(1, int(k))
     return k if (k % 2 == 1) else k + 1
 
 
+def _encode_overlay(overlay: np.ndarray) -> Optional[str]:
+    """JPEG-encode the overlay and return it as base64 (None on failure)."""
+    ok, buf = cv2.imencode(".jpg", overlay, [cv2.IMWRITE_JPEG_QUALITY, OVERLAY_JPEG_QUALITY])
+    return _b64encode_str(buf) if ok else None
+
+
 def run_shape_detect(
     bgr_image: np.ndarray,
     params: Dict[str, Any]
 ) -> Dict[str, Any]:
-    
-    denoise_enabled = bool(params.get("denoise_enabled", True))
-    h = int(params.get("denoise_h", 6))
-    template = int(params.get("denoise_template", 7))
-    search = int(params.get("denoise_search", 21))
-
-    # Ensure odd sizes
-    if template % 2 == 0:
-        template += 1
-    if search % 2 == 0:
-        search += 1
-
-    if denoise_enabled:
-        gray = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2GRAY)
-        gray = cv2.fastNlMeansDenoising(
-            gray,
-            None,
-            h,
-            template,
-            search
-        )
-    else:
-        gray = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2GRAY)
-
     """
     Run contour pipeline once and return best contour measurement + overlay image.
     """
@@ -104,11 +97,11 @@ def run_shape_detect(
     if not contours or not measurements:
         # still return overlay so you can see why it failed
         overlay = results.get("contour", bgr_image)
-        _, buf = cv2.imencode(".png", overlay)
         return {
             "success": False,
             "error": "No valid contour found",
-            "overlayBase64": base64.b64encode(buf).decode("utf-8"),
+            "overlayBase64": _encode_overlay(overlay),
+            "overlayFormat": "jpeg",
             "paramsUsed": p,
         }
 
@@ -118,8 +111,7 @@ def run_shape_detect(
     best_m = measurements[best_i]
 
     overlay = results.get("contour", bgr_image)
-    ok, buf = cv2.imencode(".png", overlay)
-    overlay_b64 = base64.b64encode(buf).decode("utf-8") if ok else None
+    overlay_b64 = _encode_overlay(overlay)
 
     return {
         "success": True,
@@ -136,4 +128,5 @@ def run_shape_detect(
             "angle": float(best_m["angle"]),
         },
         "overlayBase64": overlay_b64,
+        "overlayFormat": "jpeg",
     }
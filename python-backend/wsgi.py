@@ -0,0 +1,17 @@
+"""
+wsgi.py
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn_conf.py wsgi:app                                     (Linux/macOS)
+    waitress-serve --listen=0.0.0.0:5000 --threads=8 --call wsgi:create_app   (Windows)
+"""
+
+from app import app, preload_calibration
+
+application = app
+
+
+def create_app():
+    """App factory for servers that do not fork (waitress --call)"""
+    preload_calibration()
+    return app
@@ -274,7 +274,7 @@ const MoistureDebug = () => {
         const visData = await visRes.json();
         if (visData?.success && visData?.visualization) {
           setVisualizationImage(
-            `data:image/png;base64,${visData.visualization}`
+            `data:image/${visData.visualizationFormat || "png"};base64,${visData.visualization}`
           );
         }
       } catch {
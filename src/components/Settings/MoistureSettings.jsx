@@ -3,6 +3,7 @@ import { Settings, Trash2, Check, X, Eye, Plus, Calendar, Edit } from 'lucide-re
 
 const MoistureSettings = ({ onBack, onEditCalibration }) => {
   const LARAVEL_API_URL = import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:8000';
+  const FLASK_API = 'http://127.0.0.1:5000';
   
   const [calibrations, setCalibrations] = useState([]);
   const [activeCalibration, setActiveCalibration] = useState(null);
@@ -41,6 +42,13 @@ const MoistureSettings = ({ onBack, onEditCalibration }) => {
     }
   };
 
+  // The OCR server caches the active calibration; make it re-read it
+  // after anything that changes which calibration is active
+  const refreshOcrCalibration = () => {
+    fetch(`${FLASK_API}/seven-segment/calibration/refresh`, { method: 'POST' })
+      .catch(err => console.warn('Could not refresh OCR calibration:', err));
+  };
+
   const setAsActive = async (id) => {
     try {
       const response = await fetch(`${LARAVEL_API_URL}/api/calibration/${id}/activate`, {
@@ -55,6 +63,7 @@ const MoistureSettings = ({ onBack, onEditCalibration }) => {
       const data = await response.json();
       
       if (data.success) {
+        refreshOcrCalibration();
         await loadCalibrations();
         alert('Calibration activated successfully!');
       } else {
@@ -79,6 +88,7 @@ const MoistureSettings = ({ onBack, onEditCalibration }) => {
       const data = await response.json();
       
       if (data.success) {
+        refreshOcrCalibration();
         await loadCalibrations();
         setShowDeleteConfirm(null);
         alert('Calibration deleted successfully!');
@@ -1469,7 +1469,7 @@ const SevenSegmentCalibration = ({ onComplete, onCancel }) => {
                     }
 
                     setVisualizationImage(
-                      `data:image/png;base64,${data.visualization}`,
+                      `data:image/${data.visualizationFormat || "png"};base64,${data.visualization}`,
                     );
                   } catch (err) {
                     setError(err.message || "Failed to visualize segments");
@@ -37,6 +37,7 @@ export default function Measurement({
   const [panelOpen, setPanelOpen] = useState(true);
 
   const [overlayBase64, setOverlayBase64] = useState(null);
+  const [overlayFormat, setOverlayFormat] = useState("png");
   const [result, setResult] = useState(null);
   const [busy, setBusy] = useState(false);
   const [err, setErr] = useState(null);
@@ -145,10 +146,12 @@ export default function Measurement({
       const data = await res.json();
       if (!data.success) {
         setOverlayBase64(data.overlayBase64 || null);
+        setOverlayFormat(data.overlayFormat || "png");
         throw new Error(data.error || "Detection failed");
       }
 
       setOverlayBase64(data.overlayBase64 || null);
+      setOverlayFormat(data.overlayFormat || "png");
       setResult(data.best || null);
     } catch (e) {
       setErr(e?.message || "Failed to measure");
@@ -223,7 +226,7 @@ export default function Measurement({
       {overlayBase64 && (
         <img
           alt="overlay"
-          src={`data:image/png;base64,${overlayBase64}`}
+          src={`data:image/${overlayFormat};base64,${overlayBase64}`}
           style={{
             position: "absolute",
             inset: 0,